@@ -19,40 +19,50 @@ import time
 import sys
 import re
 import os
+import functools
 import shutil
+import subprocess
 import requests
-import yaml
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple, Optional
+from types import MappingProxyType
+from typing import List, Dict, Any, Tuple, Optional, Iterator, Mapping, TYPE_CHECKING
 
-# Third-party imports
-import spacy
-from faker import Faker
+# Third-party imports (Faker is imported lazily; see get_fake)
 import ollama 
 from tqdm import tqdm 
 
+from config_store import load_config
+
+if TYPE_CHECKING:
+    from faker import Faker
+
 # =============================================================================
 #  CONFIGURATION & SETUP
 # =============================================================================
 
-CONFIG_FILE = 'config.yaml'
+CONF: Dict[str, Any]
+OLLAMA_MODEL: str
+COPILOT_AGENT_ID: str
+
+def apply_config(conf: Dict[str, Any]):
+    """Installs conf as CONF and re-binds the hot-path settings derived from it."""
+    global CONF, OLLAMA_MODEL, COPILOT_AGENT_ID
+    CONF = conf
+    OLLAMA_MODEL = conf['mode']['ollama_model']
+    COPILOT_AGENT_ID = conf['simulation']['copilot_agent_id']
 
-def load_config() -> Dict[str, Any]:
-    if not os.path.exists(CONFIG_FILE):
-        print(f"[!] ERROR: {CONFIG_FILE} not found.")
-        sys.exit(1)
-    with open(CONFIG_FILE, 'r') as f: #type: ignore
-        return yaml.safe_load(f)
+apply_config(load_config())
 
-CONF = load_config()
-fake = Faker()
 
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    from spacy.cli.download import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+@functools.lru_cache(maxsize=None)
+def get_fake() -> "Faker":
+    """Creates the Faker instance on first use; real-Azure runs never need it."""
+    print("  > Initializing Faker...")
+    from faker import Faker
+    return Faker()
 
 # =============================================================================
 #  HELPER: CHECKPOINTING
@@ -111,44 +121,77 @@ def check_ollama_status() -> bool:
     except Exception:
         return False
 
-def generate_ollama_json(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+@functools.lru_cache(maxsize=32)
+def _generation_failed(error_text: str) -> Mapping[str, Any]:
+    """Shared read-only fallback; an unreachable Ollama fails every record the same way."""
+    return MappingProxyType({"prompt": "Error", "response": f"Generation failed: {error_text}", "reference_answer": "N/A"})
+
+def generate_ollama_json(system_prompt: str, user_prompt: str) -> Mapping[str, Any]:
     """Generic wrapper for Ollama JSON generation."""
     try:
-        response = ollama.chat(model=CONF['mode']['ollama_model'], messages=[
+        response = ollama.chat(model=OLLAMA_MODEL, messages=[
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': user_prompt},
         ], format='json')
         return json.loads(response['message']['content'])
     except Exception as e:
-        return {"prompt": "Error", "response": f"Generation failed: {e}", "reference_answer": "N/A"}
+        return _generation_failed(str(e))
+
+def generate_ollama_json_parallel(prompts: List[Tuple[str, str]], desc: str, unit: str) -> Iterator[Tuple[int, Mapping[str, Any]]]:
+    """Runs generate_ollama_json over (system, user) prompt pairs on a thread pool.
 
-def get_spacy_context() -> Dict[str, str]:
-    raw_name = fake.name()
-    raw_dept = fake.job()
-    doc = nlp(f"{raw_name} works in {raw_dept}.")
-    person = [ent.text for ent in doc.ents if ent.label_ == "PERSON"]
-    return {"employee_name": person[0] if person else raw_name, "department": raw_dept}
+    Yields (index, result) in completion order so callers can checkpoint as they go.
+    Worker count comes from mode.ollama_parallel; match it to Ollama's OLLAMA_NUM_PARALLEL.
+    """
+    workers = max(1, CONF['mode'].get('ollama_parallel') or 4)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(generate_ollama_json, sys_p, user_p): i for i, (sys_p, user_p) in enumerate(prompts)}
+        with tqdm(total=len(futures), desc=desc, unit=unit, ncols=80) as pbar:
+            for fut in as_completed(futures):
+                pbar.update(1)
+                yield futures[fut], fut.result()
+    finally:
+        # Don't keep generating queued prompts after an interrupt.
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def get_employee_context() -> Dict[str, str]:
+    fake = get_fake()
+    return {"employee_name": fake.name(), "department": fake.job()}
+
+def uuid4_batch(n: int) -> List[str]:
+    """Returns n random UUID4 strings from a single os.urandom call."""
+    raw = os.urandom(16 * n)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
+
+# Synthetic timestamps: one wall-clock read at import, then monotonic offsets.
+_BASE_DT = datetime.now()
+_BASE_NS = time.perf_counter_ns()
+
+def synthetic_now() -> datetime:
+    return _BASE_DT + timedelta(microseconds=(time.perf_counter_ns() - _BASE_NS) // 1000)
 
 def wrap_in_azure_schema(prompt_text: str, response_text: str, is_adversarial: bool = False, technique: str = "N/A") -> Dict[str, Any]:
-    user_id = str(uuid.uuid4())
-    bot_id = CONF['simulation']['copilot_agent_id']
+    user_id, user_msg_id, bot_msg_id, interaction_id = uuid4_batch(4)
+    bot_id = COPILOT_AGENT_ID
+    now = synthetic_now()
     
     user_msg = {
-        "id": str(uuid.uuid4()),
-        "createdDateTime": datetime.now().isoformat() + "Z",
+        "id": user_msg_id,
+        "createdDateTime": now.isoformat() + "Z",
         "from": {"user": {"id": user_id, "displayName": "Employee"}},
         "body": {"contentType": "html", "content": f"<div>{prompt_text}</div>"}
     }
 
     bot_msg = {
-        "id": str(uuid.uuid4()),
-        "createdDateTime": (datetime.now() + timedelta(seconds=2)).isoformat() + "Z",
+        "id": bot_msg_id,
+        "createdDateTime": (now + timedelta(seconds=2)).isoformat() + "Z",
         "from": {"user": {"id": bot_id, "displayName": "Copilot"}},
         "body": {"contentType": "html", "content": f"<div>{response_text}</div>"}
     }
 
     return {
-        "interaction_id": str(uuid.uuid4()),
+        "interaction_id": interaction_id,
         "user_message": user_msg,
         "bot_message": bot_msg,
         "_pipeline_meta": {
@@ -162,9 +205,74 @@ def wrap_in_azure_schema(prompt_text: str, response_text: str, is_adversarial: b
 #  PHASE 1: DATA ACQUISITION
 # =============================================================================
 
-def get_azure_access_token() -> str:
-    print("  > Authenticating with Azure Active Directory...")
+# Shared HTTP session: keeps TCP/TLS connections alive across Azure AD and Graph calls,
+# and retries throttling/transient errors honouring Retry-After.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+))
+# Slower backoff for the token endpoint: freshly granted app roles can take a while to propagate.
+SESSION.mount("https://login.microsoftonline.com/", HTTPAdapter(
+    max_retries=Retry(
+        total=5,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+))
+
+TOKEN_CACHE_FILE = '.azure_token.json'
+TOKEN_EXPIRY_MARGIN_SECS = 60
+
+def _load_cached_token(creds: Dict[str, Any]) -> str:
+    try:
+        with open(TOKEN_CACHE_FILE, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return ""
+    if cached.get('tenant_id') != creds['tenant_id'] or cached.get('client_id') != creds['client_id']:
+        return ""
+    if time.time() >= cached.get('exp', 0):
+        return ""
+    return cached.get('token', "")
+
+def _save_cached_token(creds: Dict[str, Any], token: str, expires_in: int):
+    """Persists the token (owner-only permissions) so later runs and stages can reuse it."""
+    cached = {
+        'tenant_id': creds['tenant_id'],
+        'client_id': creds['client_id'],
+        'token': token,
+        'exp': time.time() + expires_in - TOKEN_EXPIRY_MARGIN_SECS,
+    }
+    tmp_path = f"{TOKEN_CACHE_FILE}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cached, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, TOKEN_CACHE_FILE)
+    except OSError as e:
+        print(f"  [WARN] Could not cache Azure token: {e}")
+
+def get_azure_access_token(force_refresh: bool = False) -> str:
     creds = CONF['azure']
+    if not force_refresh:
+        token = _load_cached_token(creds)
+        if token:
+            print("  > Reusing cached Azure access token.")
+            return token
+    print("  > Authenticating with Azure Active Directory...")
     url = f"https://login.microsoftonline.com/{creds['tenant_id']}/oauth2/v2.0/token"
     payload = {
         'client_id': creds['client_id'],
@@ -173,54 +281,122 @@ def get_azure_access_token() -> str:
         'grant_type': 'client_credentials'
     }
     try:
-        response = requests.post(url, data=payload)
+        response = SESSION.post(url, data=payload)
         response.raise_for_status()
-        return response.json().get('access_token')
+        body = response.json()
+        token = body.get('access_token')
+        if token:
+            _save_cached_token(creds, token, int(body.get('expires_in', 0)))
+        return token
     except Exception as e:
         print(f"  [ERROR] Azure Auth Failed. Details: {e}")
         return ""
 
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_BATCH_SIZE = 20  # Hard limit on sub-requests per Graph $batch POST
+GRAPH_BATCH_MAX_RETRIES = 3
+GRAPH_MAX_CHATS = 20
+
+def graph_request(method: str, url: str, headers: Dict[str, str], **kwargs: Any) -> requests.Response:
+    """Sends a Graph request; on 401 re-authenticates once, updating headers in place, and retries."""
+    response = SESSION.request(method, url, headers=headers, **kwargs)
+    if response.status_code == 401:
+        token = get_azure_access_token(force_refresh=True)
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+            response = SESSION.request(method, url, headers=headers, **kwargs)
+    return response
+
+def fetch_chat_ids(headers: Dict[str, str], cap: int = GRAPH_MAX_CHATS) -> List[str]:
+    """Walks the paged /chats listing via @odata.nextLink, requesting only the fields we use."""
+    url: Optional[str] = f"{GRAPH_BASE_URL}/chats?$select=id,topic&$top=50"
+    chat_ids: List[str] = []
+    while url and len(chat_ids) < cap:
+        try:
+            response = graph_request("GET", url, headers)
+            if response.status_code != 200: break
+            page = response.json()
+        except Exception: break
+        chat_ids.extend(chat['id'] for chat in page.get('value', []))
+        url = page.get('@odata.nextLink')
+    return chat_ids[:cap]
+
+def _parse_retry_after(value: Any) -> int:
+    """Seconds to wait from a Retry-After value; HTTP-date or junk values fall back to 1s."""
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+def fetch_chat_messages_batched(chat_ids: List[str], headers: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Fetches /chats/{id}/messages for many chats using Graph JSON batching.
+
+    Throttled (429) sub-requests are re-sent after the largest Retry-After in the batch.
+    """
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    batch_url = f"{GRAPH_BASE_URL}/$batch"
+    for start in tqdm(range(0, len(chat_ids), GRAPH_BATCH_SIZE), desc="Fetching Messages", unit="batch"):
+        pending = {str(i): chat_id for i, chat_id in enumerate(chat_ids[start:start + GRAPH_BATCH_SIZE])}
+        for _ in range(GRAPH_BATCH_MAX_RETRIES + 1):
+            body = {"requests": [
+                {"id": req_id, "method": "GET", "url": f"/chats/{chat_id}/messages?$top=50&$orderby=createdDateTime desc"}
+                for req_id, chat_id in pending.items()
+            ]}
+            try:
+                resp = graph_request("POST", batch_url, headers, json=body)
+                resp.raise_for_status()
+                responses = resp.json().get('responses', [])
+            except Exception:
+                break
+            retry_after = 0
+            for sub in responses:
+                if sub.get('status') == 429:
+                    retry_after = max(retry_after, _parse_retry_after(sub.get('headers', {}).get('Retry-After')))
+                    continue
+                chat_id = pending.pop(sub.get('id'), None)
+                if chat_id and sub.get('status') == 200:
+                    results[chat_id] = sub.get('body', {}).get('value', [])
+            if not pending or not retry_after:
+                break
+            time.sleep(retry_after)
+    return results
+
 def fetch_real_azure_stream() -> List[Dict[str, Any]]:
     token = get_azure_access_token()
     if not token: return []
     headers = {'Authorization': f'Bearer {token}'}
     bot_id = CONF['azure'].get("bot_user_id")
     print("  > Fetching Chat Threads from Microsoft Graph...")
-    chats_url = "https://graph.microsoft.com/v1.0/chats"
-    try:
-        response = requests.get(chats_url, headers=headers)
-        if response.status_code != 200: return []
-        chats = response.json().get('value', [])
-    except Exception: return []
+    chat_ids = fetch_chat_ids(headers)
+    if not chat_ids: return []
+
+    messages_by_chat = fetch_chat_messages_batched(chat_ids, headers)
 
     stream = []
-    for chat in tqdm(chats[:20], desc="Fetching Messages", unit="chat"):
-        chat_id = chat['id']
-        msgs_url = f"https://graph.microsoft.com/v1.0/chats/{chat_id}/messages?$top=50"
-        try:
-            msg_resp = requests.get(msgs_url, headers=headers)
-            if msg_resp.status_code == 200:
-                messages = msg_resp.json().get('value', [])
-                messages.sort(key=lambda x: x.get('createdDateTime', ''))
+    for chat_id in chat_ids:
+        messages = messages_by_chat.get(chat_id)
+        if not messages: continue
+        current_user_msg = None
+        # Graph returns them newest-first (createdDateTime desc); walk backwards for chronological order.
+        for msg in reversed(messages):
+            # System/event messages have "from": null and app senders have "user": null; skip both.
+            sender_id = ((msg.get('from') or {}).get('user') or {}).get('id')
+            if not sender_id: continue
+            if sender_id != bot_id:
+                current_user_msg = msg
+            elif sender_id == bot_id and current_user_msg:
+                interaction = {
+                    "interaction_id": chat_id,
+                    "user_message": current_user_msg,
+                    "bot_message": msg,
+                    "_pipeline_meta": {
+                        "is_adversarial": False,
+                        "adversarial_technique": "N/A",
+                        "reference_answer": "N/A"
+                    }
+                }
+                stream.append(interaction)
                 current_user_msg = None
-                for msg in messages:
-                    sender_id = msg.get('from', {}).get('user', {}).get('id')
-                    if sender_id != bot_id:
-                        current_user_msg = msg
-                    elif sender_id == bot_id and current_user_msg:
-                        interaction = {
-                            "interaction_id": chat_id,
-                            "user_message": current_user_msg,
-                            "bot_message": msg,
-                            "_pipeline_meta": {
-                                "is_adversarial": False,
-                                "adversarial_technique": "N/A",
-                                "reference_answer": "N/A"
-                            }
-                        }
-                        stream.append(interaction)
-                        current_user_msg = None
-        except Exception: continue
     return stream
 
 def generate_base_synthetic_stream() -> List[Dict[str, Any]]:
@@ -235,12 +411,15 @@ def generate_base_synthetic_stream() -> List[Dict[str, Any]]:
     if ckpt.get_start_index() >= count:
         return ckpt.get_data()
 
-    for _ in tqdm(range(ckpt.get_start_index(), count), desc="Base Gen", unit="rec", ncols=80):
+    prompts = []
+    for _ in range(ckpt.get_start_index(), count):
         topic = random.choice(topics)
-        ctx = get_spacy_context()
+        ctx = get_employee_context()
         user_input = (f"Context: Employee {ctx['employee_name']} in {ctx['department']}.\nTopic: {topic}.\n"
                       "Generate a standard employee question and a helpful chatbot response.")
-        data = generate_ollama_json(prompt_sys, user_input)
+        prompts.append((prompt_sys, user_input))
+
+    for _, data in generate_ollama_json_parallel(prompts, desc="Base Gen", unit="rec"):
         wrapped_record = wrap_in_azure_schema(data.get('prompt', ''), data.get('response', ''))
         
         # Save to checkpoint
@@ -252,8 +431,11 @@ def generate_base_synthetic_stream() -> List[Dict[str, Any]]:
 #  PHASE 2: RED TEAM LAYER
 # =============================================================================
 
+# Negated character class instead of '<.*?>': no backtracking on malformed HTML.
+_TAG_RE = re.compile(r'<[^>]*>')
+
 def clean_html(raw_html: str) -> str:
-    return re.sub('<.*?>', '', raw_html).strip()
+    return _TAG_RE.sub('', raw_html).strip()
 
 def load_expansion_examples(file_path: str) -> List[Dict[str, str]]:
     if not os.path.exists(file_path): return []
@@ -270,9 +452,12 @@ def load_expansion_examples(file_path: str) -> List[Dict[str, str]]:
         return examples
     except Exception: return []
 
+DEFECT_LABELS = ("PII", "Toxicity", "Negative Sentiment")
+
 def run_red_team_layer(stream: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     rt_conf = CONF['simulation']['red_teaming']
     if not rt_conf['active']: return stream
+    red_team_sys = CONF['prompts']['red_team_instruction']
     
     print("\n[RED TEAM LAYER ACTIVE]")
     
@@ -301,9 +486,9 @@ def run_red_team_layer(stream: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         # We append NEW records to the checkpoint
         
         if ckpt.get_start_index() < count:
-            for _ in tqdm(range(ckpt.get_start_index(), count), desc="Expanding", unit="rec", ncols=80):
-                user_prompt = f"Generate 1 new pair.\n{style_examples_str}"
-                data = generate_ollama_json(sys_prompt, user_prompt)
+            user_prompt = f"Generate 1 new pair.\n{style_examples_str}"
+            prompts = [(sys_prompt, user_prompt)] * (count - ckpt.get_start_index())
+            for _, data in generate_ollama_json_parallel(prompts, desc="Expanding", unit="rec"):
                 wrapped = wrap_in_azure_schema(data.get('prompt', ''), data.get('response', ''))
                 ckpt.append(wrapped)
         
@@ -311,23 +496,28 @@ def run_red_team_layer(stream: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         stream.extend(ckpt.get_data())
 
     # 2. DEFECTS (In-place modification, typically fast, no checkpointing needed)
-    rates = rt_conf['defect_injection']['rates']
+    di_conf = rt_conf['defect_injection']
+    rates = di_conf['rates']
     print("  > Scanning stream for defects...")
-    for record in tqdm(stream, desc="Injecting Defects", unit="rec", ncols=80):
-        meta = record['_pipeline_meta']
-        if meta['is_adversarial']: continue
-        defects = []
-        if random.random() < rates['pii']: defects.append("PII")
-        if random.random() < rates['toxicity']: defects.append("Toxicity")
-        if random.random() < rates['negative_sentiment']: defects.append("Negative Sentiment")
-        
+    # Roll every record/defect pair in one pass from a dedicated RNG; a fixed seed makes the rates reproducible.
+    candidates = [record for record in stream if not record['_pipeline_meta']['is_adversarial']]
+    rng = random.Random(di_conf.get('seed'))
+    thresholds = (rates['pii'], rates['toxicity'], rates['negative_sentiment'])
+    defect_records = []
+    defect_prompts = []
+    for record in candidates:
+        defects = [label for label, threshold in zip(DEFECT_LABELS, thresholds) if rng.random() < threshold]
         if defects:
             curr_q = clean_html(record['user_message']['body']['content'])
             curr_a = clean_html(record['bot_message']['body']['content'])
             rewrite_prompt = (f"Original Q: {curr_q}\nOriginal A: {curr_a}\nTask: Rewrite to include defects: {', '.join(defects)}.")
-            new_data = generate_ollama_json(CONF['prompts']['red_team_instruction'], rewrite_prompt)
-            if new_data.get('prompt'): record['user_message']['body']['content'] = f"<div>{new_data['prompt']}</div>"
-            if new_data.get('response'): record['bot_message']['body']['content'] = f"<div>{new_data['response']}</div>"
+            defect_records.append(record)
+            defect_prompts.append((red_team_sys, rewrite_prompt))
+
+    for i, new_data in generate_ollama_json_parallel(defect_prompts, desc="Injecting Defects", unit="rec"):
+        record = defect_records[i]
+        if new_data.get('prompt'): record['user_message']['body']['content'] = f"<div>{new_data['prompt']}</div>"
+        if new_data.get('response'): record['bot_message']['body']['content'] = f"<div>{new_data['response']}</div>"
 
     # 3. ADVERSARIAL
     adv_conf = rt_conf['adversarial_injection']
@@ -342,11 +532,14 @@ def run_red_team_layer(stream: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         ckpt = GranularCheckpoint('adversarial', count)
         
         if ckpt.get_start_index() < count:
-            for _ in tqdm(range(ckpt.get_start_index(), count), desc="Adversarial Gen", unit="atk", ncols=80):
-                tech = random.choice(techniques)
-                atk_prompt = f"Generate a user prompt using technique: '{tech}'. Generate a chatbot response. Return JSON."
-                data = generate_ollama_json(CONF['prompts']['red_team_instruction'], atk_prompt)
-                wrapped = wrap_in_azure_schema(data.get('prompt', ''), data.get('response', ''), is_adversarial=True, technique=tech)
+            techs = [random.choice(techniques) for _ in range(ckpt.get_start_index(), count)]
+            prompts = [
+                (red_team_sys,
+                 f"Generate a user prompt using technique: '{tech}'. Generate a chatbot response. Return JSON.")
+                for tech in techs
+            ]
+            for i, data in generate_ollama_json_parallel(prompts, desc="Adversarial Gen", unit="atk"):
+                wrapped = wrap_in_azure_schema(data.get('prompt', ''), data.get('response', ''), is_adversarial=True, technique=techs[i])
                 ckpt.append(wrapped)
                 
         stream.extend(ckpt.get_data())
@@ -354,11 +547,13 @@ def run_red_team_layer(stream: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # 4. REFERENCE ANSWER
     if rt_conf['generate_reference_answer']:
         print("  > Generating Reference Answers for all records...")
-        for record in tqdm(stream, desc="Ref Answers", unit="rec", ncols=80):
-            curr_q = clean_html(record['user_message']['body']['content'])
-            ref_prompt = f"Question: {curr_q}\nTask: Generate a factual Reference Answer."
-            data = generate_ollama_json(CONF['prompts']['red_team_instruction'], ref_prompt)
-            record['_pipeline_meta']['reference_answer'] = data.get('response', 'N/A')
+        prompts = [
+            (red_team_sys,
+             f"Question: {clean_html(record['user_message']['body']['content'])}\nTask: Generate a factual Reference Answer.")
+            for record in stream
+        ]
+        for i, data in generate_ollama_json_parallel(prompts, desc="Ref Answers", unit="rec"):
+            stream[i]['_pipeline_meta']['reference_answer'] = data.get('response', 'N/A')
 
     return stream
 
@@ -366,43 +561,76 @@ def run_red_team_layer(stream: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 #  PHASE 3: ETL & FLATTENING
 # =============================================================================
 
-def flatten_azure_to_modelop(stream: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    flat_dataset = []
-    for record in stream:
+def flatten_azure_to_modelop(stream: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Yields flattened records one at a time so the export can be streamed to disk."""
+    session_ids = uuid4_batch(len(stream))
+    for record, session_id in zip(stream, session_ids):
         raw_q = record['user_message']['body']['content']
         raw_a = record['bot_message']['body']['content']
         meta = record['_pipeline_meta']
-        flat_record = {
+        clean_a = clean_html(raw_a)
+        yield {
             "interaction_id": record['interaction_id'],
             "timestamp": record['user_message']['createdDateTime'],
-            "session_id": str(uuid.uuid4()),
+            "session_id": session_id,
             "prompt": clean_html(raw_q),
-            "response": clean_html(raw_a),
+            "response": clean_a,
             "reference_answer": meta['reference_answer'],
-            "score_column": clean_html(raw_a),
+            "score_column": clean_a,
             "label_column": meta['reference_answer'],
             "protected_class_gender": random.choice(["Male", "Female", "Non-Binary"]),
             "is_adversarial": meta['is_adversarial'],
             "adversarial_technique": meta['adversarial_technique']
         }
-        flat_dataset.append(flat_record)
-    return flat_dataset
 
 # =============================================================================
 #  FILE MANAGEMENT
 # =============================================================================
 
+def _place_file(src: str, dst: str):
+    """Hard link, then reflink, then a byte copy; dst must not exist yet."""
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    if sys.platform.startswith('linux'):
+        try:
+            subprocess.run(['cp', '--reflink=auto', src, dst], check=True)
+            return
+        except (OSError, subprocess.CalledProcessError):
+            if os.path.lexists(dst):
+                os.remove(dst)
+    shutil.copy2(src, dst)
+
+def link_or_copy(src: str, dst: str):
+    """Places src at dst as cheaply as possible: hard link, then reflink, then a byte copy.
+
+    Master files are treated as read-only downstream, so sharing the inode is safe.
+    The file is staged beside dst and swapped in, so a failure never leaves dst missing.
+    """
+    tmp_path = f"{dst}.tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        _place_file(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def manage_master_files(latest_file_path: str):
     print("\n--- MASTER FILE MANAGEMENT ---")
     files_conf = CONF['files']
     master_comp = files_conf.get('master_comparator_file', 'comparator_data.json')
     if files_conf['auto_update_comparator']:
-        shutil.copy(latest_file_path, master_comp)
+        link_or_copy(latest_file_path, master_comp)
         print(f"  [UPDATE] Root '{master_comp}' overwritten with latest run data.")
     
     master_base = files_conf.get('master_baseline_file', 'baseline_data.json')
     if not os.path.exists(master_base):
-        shutil.copy(latest_file_path, master_base)
+        link_or_copy(latest_file_path, master_base)
         print(f"  [INIT] Created '{master_base}'.")
     else:
         print(f"  [SKIP] '{master_base}' exists.")
@@ -429,19 +657,36 @@ def main():
     stream = run_red_team_layer(stream)
 
     # 3. EXPORT
-    final_dataset = flatten_azure_to_modelop(stream)
-    
     output_dir = CONF['files']['output_folder']
     os.makedirs(output_dir, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     out_path = os.path.join(output_dir, f"modelop_llm_data_{timestamp}.json")
     
-    with open(out_path, "w") as f:
-        json.dump(final_dataset, f, indent=2)
+    # Written as a compact JSON array, one record at a time, instead of building
+    # the whole flattened dataset in memory and pretty-printing it.
+    # Staged under a non-.json name and renamed only once complete, so a failure
+    # mid-export never leaves a truncated modelop_llm_data_*.json behind.
+    tmp_path = f"{out_path}.tmp"
+    total_count = 0
+    adversarial_count = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            f.write("[")
+            for flat_record in flatten_azure_to_modelop(stream):
+                if total_count: f.write(",")
+                f.write(json.dumps(flat_record, separators=(',', ':')))
+                total_count += 1
+                if flat_record['is_adversarial']: adversarial_count += 1
+            f.write("]")
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
         
     print(f"\n--- PIPELINE COMPLETE ---")
-    print(f"  Total Records: {len(final_dataset)}")
-    print(f"  Adversarial Count: {len([x for x in final_dataset if x['is_adversarial']])}")
+    print(f"  Total Records: {total_count}")
+    print(f"  Adversarial Count: {adversarial_count}")
     print(f"  Archive Saved: {out_path}")
 
     # 4. UPDATE MASTER FILES & CLEANUP
@@ -450,5 +695,14 @@ def main():
     # 5. CLEANUP CHECKPOINTS (Only on success)
     GranularCheckpoint.clear_all_checkpoints()
 
+def run_etl(stage_name: str, conf: Optional[Dict[str, Any]] = None):
+    """Runs one pipeline pass in-process, reusing the already-initialised Faker/HTTP state.
+
+    The demo orchestrator calls this once per stage instead of spawning a fresh interpreter.
+    """
+    os.environ['CURRENT_STAGE'] = stage_name
+    apply_config(conf if conf is not None else load_config())
+    main()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
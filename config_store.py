@@ -0,0 +1,120 @@
+"""
+ModelOp Partner Connector: Config Store
+=======================================
+Description:
+    Loads and saves config.yaml for both the ETL connector and the demo
+    orchestrator.
+
+    - Parsed config is cached in memory, keyed by the file's mtime_ns + size.
+    - A JSON sidecar (.config.json) is preferred over re-parsing YAML when it
+      was built from the exact same config.yaml (mtime_ns + size) and the data
+      round-trips through JSON.
+"""
+
+import copy
+import json
+import os
+import stat
+import sys
+from typing import Any, Callable, Dict, IO, List, Optional
+
+import yaml
+
+# Prefer the libyaml C bindings when PyYAML was built with them (~10x faster).
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+CONFIG_FILE = 'config.yaml'
+CONFIG_JSON_CACHE = '.config.json'
+
+# Parsed config, keyed by the file's fingerprint so YAML is only re-parsed on edits.
+_CONFIG_CACHE: Dict[str, Any] = {'fingerprint': None, 'data': None}
+
+def _fingerprint(path: str) -> List[int]:
+    """Identifies a version of a file; compared for equality, so back-dated edits still count."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def _write_atomic(path: str, dump_fn: Callable[[IO[str]], None], mode: Optional[int] = None):
+    """Writes via a temp file + os.replace so readers never see a partial file.
+
+    Symlinks are resolved so the link survives, and the existing file's permissions are
+    kept unless an explicit mode is given (config.yaml holds the Azure client secret).
+    """
+    path = os.path.realpath(path)
+    if mode is None:
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            pass
+    tmp_path = f"{path}.tmp"
+    try:
+        # Start owner-only when a mode is known; otherwise fall back to the umask default.
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600 if mode is not None else 0o666)
+        with os.fdopen(fd, 'w') as f:
+            dump_fn(f)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _json_sidecar_text(data: Any, fingerprint: List[int]) -> Optional[str]:
+    """Returns the sidecar JSON, or None if the data would not read back identically
+    (e.g. YAML dates or non-string mapping keys)."""
+    try:
+        text = json.dumps(data)
+    except (TypeError, ValueError):
+        return None
+    if json.loads(text) != data:
+        return None
+    return json.dumps({'source': fingerprint, 'data': data})
+
+def _write_sidecar(data: Any, fingerprint: List[int]):
+    text = _json_sidecar_text(data, fingerprint)
+    try:
+        if text is None:
+            if os.path.exists(CONFIG_JSON_CACHE):
+                os.remove(CONFIG_JSON_CACHE)
+        else:
+            # Same owner-only permissions as the Azure token cache: it copies the client secret.
+            _write_atomic(CONFIG_JSON_CACHE, lambda f: f.write(text), mode=0o600)
+    except OSError:
+        pass
+
+def _read_config_file(fingerprint: List[int]) -> Dict[str, Any]:
+    try:
+        with open(CONFIG_JSON_CACHE, 'r') as f:
+            cached = json.load(f)
+        if isinstance(cached, dict) and cached.get('source') == fingerprint:
+            return cached['data']
+    except (OSError, ValueError, KeyError):
+        pass
+    with open(CONFIG_FILE, 'r') as f:
+        data = yaml.load(f, Loader=_YamlLoader)
+    _write_sidecar(data, fingerprint)
+    return data
+
+def load_config() -> Dict[str, Any]:
+    if not os.path.exists(CONFIG_FILE):
+        print(f"[!] ERROR: {CONFIG_FILE} not found.")
+        sys.exit(1)
+    fingerprint = _fingerprint(CONFIG_FILE)
+    if _CONFIG_CACHE['fingerprint'] != fingerprint:
+        _CONFIG_CACHE['data'] = _read_config_file(fingerprint)
+        _CONFIG_CACHE['fingerprint'] = fingerprint
+    return copy.deepcopy(_CONFIG_CACHE['data'])
+
+def save_config(config_data: Dict[str, Any]):
+    _write_atomic(CONFIG_FILE, lambda f: yaml.dump(config_data, f, Dumper=_YamlDumper, sort_keys=False, default_flow_style=False))
+    fingerprint = _fingerprint(CONFIG_FILE)
+    _write_sidecar(config_data, fingerprint)
+    # Refresh the cache from what we just wrote; no need to re-parse.
+    _CONFIG_CACHE['data'] = copy.deepcopy(config_data)
+    _CONFIG_CACHE['fingerprint'] = fingerprint
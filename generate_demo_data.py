@@ -5,23 +5,23 @@ Description:
     Automates the creation of 'Phase 1 Lite' demo datasets.
     
     UPDATES:
-    - Passes 'CURRENT_STAGE' env var to the ETL script to enable granular resume.
+    - Runs every stage in this interpreter via azure_moc_connector.run_etl, so
+      Faker/HTTP setup is paid once instead of once per stage.
+    - Passes 'CURRENT_STAGE' to the ETL run to enable granular resume.
     - Ignores .checkpoint files during archival/cleanup so partial runs persist.
     - Standardized archival to '02_Archived'.
 """
 
 import os
-import sys
 import shutil
-import subprocess
-import yaml
-import glob
 import time
 import datetime
+import traceback
+
+from config_store import load_config, save_config
 
 # --- Constants ---
-CONFIG_FILE = 'config.yaml'
-ETL_SCRIPT = 'azure_moc_connector.py' 
+ETL_ENTRYPOINT = 'azure_moc_connector.run_etl'
 OUTPUT_DIR = 'generated_chats'
 DEMO_DIR = 'phase_1_lite_demo'
 ARCHIVE_SUBDIR = '02_Archived'
@@ -35,47 +35,34 @@ STAGES = [
     "generate_day3"
 ]
 
-def load_config():
-    if not os.path.exists(CONFIG_FILE):
-        print(f"[!] Error: {CONFIG_FILE} not found.")
-        sys.exit(1)
-    with open(CONFIG_FILE, 'r') as f:
-        return yaml.safe_load(f)
-
-def save_config(config_data):
-    with open(CONFIG_FILE, 'w') as f:
-        yaml.dump(config_data, f, sort_keys=False)
-
-def run_etl_script(stage_name):
-    """Executes the ETL script, passing the current stage for resume logic."""
-    print(f"  > Running {ETL_SCRIPT} [{stage_name}]...")
-    
-    # Pass the stage name to the child process via Environment Variable
-    env = os.environ.copy()
-    env['CURRENT_STAGE'] = stage_name
+def run_etl_script(stage_name, conf):
+    """Runs the ETL in-process with the stage's config, passing the stage for resume logic."""
+    print(f"  > Running {ETL_ENTRYPOINT} [{stage_name}]...")
     
-    p = None
+    # Imported lazily: the connector pulls in ollama and reads config.yaml at
+    # import time, which archival and resume prompts do not need.
+    import azure_moc_connector
     try:
-        p = subprocess.Popen([sys.executable, ETL_SCRIPT], env=env)
-        p.wait()
-        
-        if p.returncode != 0:
-            raise subprocess.CalledProcessError(p.returncode, ETL_SCRIPT)
-            
+        azure_moc_connector.run_etl(stage_name, conf)
     except KeyboardInterrupt:
-        print(f"\n  [!] Interrupted {ETL_SCRIPT}...")
-        if p:
-            p.terminate()
-        raise KeyboardInterrupt 
+        print(f"\n  [!] Interrupted {ETL_ENTRYPOINT}...")
+        raise
 
 def move_latest_output(destination_subdir, new_filename):
-    search_pattern = os.path.join(OUTPUT_DIR, 'modelop_llm_data_*.json')
-    files = glob.glob(search_pattern)
-    if not files:
+    # Single scandir pass; DirEntry.stat() reuses the directory read where the OS allows.
+    latest = None
+    if os.path.isdir(OUTPUT_DIR):
+        with os.scandir(OUTPUT_DIR) as it:
+            latest = max(
+                (e for e in it if e.name.startswith('modelop_llm_data_') and e.name.endswith('.json') and e.is_file()),
+                key=lambda e: e.stat().st_ctime,
+                default=None,
+            )
+    if latest is None:
         print("[!] No output file found to move.")
         return
 
-    latest_file = max(files, key=os.path.getctime)
+    latest_file = latest.path
     
     dest_dir = os.path.join(DEMO_DIR, destination_subdir)
     os.makedirs(dest_dir, exist_ok=True)
@@ -84,13 +71,32 @@ def move_latest_output(destination_subdir, new_filename):
     shutil.move(latest_file, dest_path)
     print(f"  > Moved output to: {dest_path}")
 
-def get_modified_timestamp(filepath):
+def get_modified_timestamp(entry):
+    """Formats a DirEntry's mtime using the stat already cached by scandir."""
     try:
-        mtime = os.path.getmtime(filepath)
+        mtime = entry.stat(follow_symlinks=False).st_mtime
     except OSError:
         mtime = time.time()
     return datetime.datetime.fromtimestamp(mtime).strftime('%Y%m%d_%H%M%S')
 
+def _iter_files(root):
+    """Recursively yields file DirEntries under root."""
+    with os.scandir(root) as it:
+        entries = list(it)
+    for entry in entries:
+        if entry.is_file(follow_symlinks=False):
+            yield entry
+        elif entry.is_dir(follow_symlinks=False):
+            yield from _iter_files(entry.path)
+
+def _archive_entry(entry, archive_path):
+    """Moves a file into the archive with its mtime appended; a same-volume rename, not a copy."""
+    ts = get_modified_timestamp(entry)
+    name, ext = os.path.splitext(entry.name)
+    new_name = f"{name}_{ts}{ext}"
+    os.replace(entry.path, os.path.join(archive_path, new_name))
+    return new_name
+
 def archive_and_clean_demo_dir():
     archive_path = os.path.join(DEMO_DIR, ARCHIVE_SUBDIR)
     if not os.path.exists(DEMO_DIR):
@@ -99,41 +105,34 @@ def archive_and_clean_demo_dir():
     print(f"  [ARCHIVE] Preserving structure, archiving files in {DEMO_DIR}...")
     os.makedirs(archive_path, exist_ok=True)
 
-    for item in os.listdir(DEMO_DIR):
-        item_path = os.path.join(DEMO_DIR, item)
-        
+    with os.scandir(DEMO_DIR) as it:
+        items = list(it)
+
+    for item in items:
         # Skip system files and CHECKPOINTS (so we don't archive partial resume data)
         # We look for any file starting with .checkpoint
-        if item in [ARCHIVE_SUBDIR, CURSOR_FILE] or item.startswith('.checkpoint'):
+        if item.name in [ARCHIVE_SUBDIR, CURSOR_FILE] or item.name.startswith('.checkpoint'):
             continue
 
-        if os.path.isfile(item_path):
+        if item.is_file():
             try:
-                ts = get_modified_timestamp(item_path)
-                name, ext = os.path.splitext(item)
-                new_name = f"{name}_{ts}{ext}"
-                shutil.move(item_path, os.path.join(archive_path, new_name))
+                new_name = _archive_entry(item, archive_path)
                 print(f"    -> Archived file: {new_name}")
             except Exception as e:
-                print(f"    [!] Failed to archive file {item}: {e}")
-
-        elif os.path.isdir(item_path):
-            for root, dirs, files in os.walk(item_path):
-                for file in files:
-                    src_file = os.path.join(root, file)
-                    # Skip checkpoints inside subfolders too
-                    if file.startswith('.checkpoint'):
-                        continue
-                        
-                    try:
-                        ts = get_modified_timestamp(src_file)
-                        name, ext = os.path.splitext(file)
-                        new_name = f"{name}_{ts}{ext}"
-                        shutil.move(src_file, os.path.join(archive_path, new_name))
-                        print(f"    -> Archived: {new_name}")
-                    except Exception as e:
-                        print(f"    [!] Failed to archive {file}: {e}")
-            print(f"    -> Cleaned folder (preserved): {item}")
+                print(f"    [!] Failed to archive file {item.name}: {e}")
+
+        elif item.is_dir():
+            for entry in _iter_files(item.path):
+                # Skip checkpoints inside subfolders too
+                if entry.name.startswith('.checkpoint'):
+                    continue
+
+                try:
+                    new_name = _archive_entry(entry, archive_path)
+                    print(f"    -> Archived: {new_name}")
+                except Exception as e:
+                    print(f"    [!] Failed to archive {entry.name}: {e}")
+            print(f"    -> Cleaned folder (preserved): {item.name}")
 
 # --- Logic Functions ---
 
@@ -154,38 +153,36 @@ def reset_config_defaults():
     except KeyError as e:
         print(f"[!] Config structure error: {e}")
     save_config(conf)
+    return conf
 
 def generate_baseline():
     print("\n--- 1. GENERATING BASELINE: HEALTHY ---")
-    reset_config_defaults()
-    run_etl_script("BASELINE") 
+    conf = reset_config_defaults()
+    run_etl_script("BASELINE", conf)
     move_latest_output("00_Baseline", "00_Business_As_Usual_Healthy.json")
 
 def generate_day1():
     print("\n--- 2. GENERATING DAY 1: TOXICITY SPIKE ---")
-    reset_config_defaults()
-    conf = load_config()
+    conf = reset_config_defaults()
     conf['simulation']['red_teaming']['defect_injection']['rates']['toxicity'] = 0.4
     save_config(conf)
-    run_etl_script("DAY1") 
+    run_etl_script("DAY1", conf)
     move_latest_output("01_Comparators", "Day_01_Snapshot_Toxicity_Spike.json")
 
 def generate_day2():
     print("\n--- 3. GENERATING DAY 2: PII LEAK ---")
-    reset_config_defaults()
-    conf = load_config()
+    conf = reset_config_defaults()
     conf['simulation']['red_teaming']['defect_injection']['rates']['pii'] = 0.6
     save_config(conf)
-    run_etl_script("DAY2") 
+    run_etl_script("DAY2", conf)
     move_latest_output("01_Comparators", "Day_02_Snapshot_PII_Leak.json")
 
 def generate_day3():
     print("\n--- 4. GENERATING DAY 3: ADVERSARIAL ATTACK ---")
-    reset_config_defaults()
-    conf = load_config()
+    conf = reset_config_defaults()
     conf['simulation']['red_teaming']['adversarial_injection']['active'] = True
     save_config(conf)
-    run_etl_script("DAY3") 
+    run_etl_script("DAY3", conf)
     move_latest_output("01_Comparators", "Day_03_Snapshot_Adversarial_Attack.json")
 
 def cleanup():
@@ -241,5 +238,7 @@ if __name__ == "__main__":
         print(f"    Cursor saved at stage: {get_cursor_stage()}")
         reset_config_defaults()
     except Exception as e:
+        # The ETL runs in-process now, so its traceback is only visible if printed here.
         print(f"\n[!] Unexpected error: {e}")
+        print(traceback.format_exc())
         reset_config_defaults()
\ No newline at end of file